@@ -5,9 +5,20 @@ Deploy with: streamlit run app.py
 """
 
 import streamlit as st
+import json
+import math
 import os
+import re
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from uuid import uuid4
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import your existing pipeline
 from well_rag_pipeline import (
@@ -17,6 +28,37 @@ from well_rag_pipeline import (
     calculate_nodal_analysis,
 )
 
+# Chunk size used when streaming uploaded PDFs to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Run document analysis in a background thread so the chat stays usable.
+# Set to False to analyze synchronously inside the button handler.
+RUN_ANALYSIS_IN_BACKGROUND = True
+ANALYSIS_WORKERS = 2
+# Seconds between checks for finished background analyses
+ANALYSIS_POLL_INTERVAL_S = 2
+
+# Number of most recent chat messages kept and rendered
+MAX_CHAT_HISTORY = 50
+
+# Per-report caches are shared by all sessions; keep only the most recent reports
+REPORT_CACHE_ENTRIES = 32
+
+# (parameter key, display label) pairs shown by show_parameters()
+BASIC_INFO_FIELDS = (
+    ("well_name", "Well Name"),
+    ("operation", "Operation"),
+    ("start_date", "Start Date"),
+    ("duration", "Duration"),
+)
+
+TECHNICAL_FIELDS = (
+    ("packer_depth_m", "Packer Depth M"),
+    ("tubing_size", "Tubing Size"),
+    ("reservoir_temp_c", "Reservoir Temp C"),
+    ("flow_rate_m3h", "Flow Rate M3H"),
+)
+
 # --------------------------------------------------------------------
 # Helper functions
 # --------------------------------------------------------------------
@@ -24,12 +66,12 @@ from well_rag_pipeline import (
 
 def format_analysis_results(report):
     """Format analysis results for chat display."""
-    msg = "✅ **Analysis Complete!**\n\n"
+    parts = ["✅ **Analysis Complete!**\n\n"]
 
     # Basic info
     params = report.get("extracted_parameters", {})
     if params.get("well_name"):
-        msg += f"**Well:** {params['well_name']}\n\n"
+        parts.append(f"**Well:** {params['well_name']}\n\n")
 
     # Nodal results
     nodal = report.get("nodal_analysis_results", {})
@@ -38,97 +80,111 @@ def format_analysis_results(report):
         op = results["operating_point"]
         prod = results["productivity"]
 
-        msg += "### ⚙️ Nodal Analysis Results\n\n"
-        msg += f"- **Flow Rate:** {op['flow_rate_m3_h']} m³/h\n"
-        msg += f"- **Wellhead Pressure:** {op['wellhead_pressure_bar']} bar\n"
-        msg += f"- **Bottomhole Pressure:** {op['bottomhole_pressure_bar']} bar\n"
-        msg += f"- **Max Flow Potential:** {prod['max_flow_rate_m3_h']} m³/h\n"
-        msg += f"- **Current Utilization:** {prod['current_utilization_pct']}%\n\n"
+        parts.append("### ⚙️ Nodal Analysis Results\n\n")
+        parts.append(f"- **Flow Rate:** {op['flow_rate_m3_h']} m³/h\n")
+        parts.append(f"- **Wellhead Pressure:** {op['wellhead_pressure_bar']} bar\n")
+        parts.append(f"- **Bottomhole Pressure:** {op['bottomhole_pressure_bar']} bar\n")
+        parts.append(f"- **Max Flow Potential:** {prod['max_flow_rate_m3_h']} m³/h\n")
+        parts.append(f"- **Current Utilization:** {prod['current_utilization_pct']}%\n\n")
 
     # Summary
     summary = report.get("summary", "")
     if summary:
-        msg += f"### 📝 Summary\n\n{summary}\n\n"
+        parts.append(f"### 📝 Summary\n\n{summary}\n\n")
 
-    msg += "💬 *Ask me questions about the results or request specific details!*"
+    parts.append("💬 *Ask me questions about the results or request specific details!*")
 
-    return msg
+    return "".join(parts)
 
 
-def format_nodal_details(results):
+# The chat formatters below are memoized per report: Streamlit reruns the
+# whole script on every interaction, so repeat questions about the same report
+# should not rebuild the markdown. The underscore-prefixed arguments are
+# excluded from Streamlit's cache key; the report id identifies their contents.
+
+
+@st.cache_data(show_spinner=False, max_entries=REPORT_CACHE_ENTRIES)
+def format_nodal_details(report_id, _results):
     """Format detailed nodal analysis results."""
+    results = _results
     op = results["operating_point"]
     pa = results["pressure_analysis"]
     fc = results["flow_characteristics"]
     prod = results["productivity"]
 
-    msg = "### ⚙️ Detailed Nodal Analysis\n\n"
+    parts = ["### ⚙️ Detailed Nodal Analysis\n\n"]
 
-    msg += "**Operating Point:**\n"
-    msg += f"- Flow Rate: {op['flow_rate_m3_h']} m³/h\n"
-    msg += f"- Wellhead Pressure: {op['wellhead_pressure_bar']} bar\n"
-    msg += f"- Bottomhole Pressure: {op['bottomhole_pressure_bar']} bar\n"
-    msg += f"- Reservoir Pressure: {op['reservoir_pressure_bar']} bar\n\n"
+    parts.append("**Operating Point:**\n")
+    parts.append(f"- Flow Rate: {op['flow_rate_m3_h']} m³/h\n")
+    parts.append(f"- Wellhead Pressure: {op['wellhead_pressure_bar']} bar\n")
+    parts.append(f"- Bottomhole Pressure: {op['bottomhole_pressure_bar']} bar\n")
+    parts.append(f"- Reservoir Pressure: {op['reservoir_pressure_bar']} bar\n\n")
 
-    msg += "**Pressure Analysis:**\n"
-    msg += f"- Hydrostatic Drop: {pa['hydrostatic_pressure_drop_bar']} bar\n"
-    msg += f"- Friction Drop: {pa['friction_pressure_drop_bar']} bar\n"
-    msg += f"- Total Drop: {pa['total_pressure_drop_bar']} bar\n\n"
+    parts.append("**Pressure Analysis:**\n")
+    parts.append(f"- Hydrostatic Drop: {pa['hydrostatic_pressure_drop_bar']} bar\n")
+    parts.append(f"- Friction Drop: {pa['friction_pressure_drop_bar']} bar\n")
+    parts.append(f"- Total Drop: {pa['total_pressure_drop_bar']} bar\n\n")
 
-    msg += "**Flow Characteristics:**\n"
-    msg += f"- Reynolds Number: {fc['reynolds_number']}\n"
-    msg += f"- Flow Regime: {fc['flow_regime']}\n"
-    msg += f"- Friction Factor: {fc['friction_factor']}\n"
-    msg += f"- Velocity: {fc['velocity_m_s']} m/s\n\n"
+    parts.append("**Flow Characteristics:**\n")
+    parts.append(f"- Reynolds Number: {fc['reynolds_number']}\n")
+    parts.append(f"- Flow Regime: {fc['flow_regime']}\n")
+    parts.append(f"- Friction Factor: {fc['friction_factor']}\n")
+    parts.append(f"- Velocity: {fc['velocity_m_s']} m/s\n\n")
 
-    msg += "**Productivity:**\n"
-    msg += f"- Productivity Index: {prod['productivity_index_m3h_bar']} m³/h/bar\n"
-    msg += f"- Maximum Flow: {prod['max_flow_rate_m3_h']} m³/h\n"
-    msg += f"- Current Utilization: {prod['current_utilization_pct']}%\n"
+    parts.append("**Productivity:**\n")
+    parts.append(f"- Productivity Index: {prod['productivity_index_m3h_bar']} m³/h/bar\n")
+    parts.append(f"- Maximum Flow: {prod['max_flow_rate_m3_h']} m³/h\n")
+    parts.append(f"- Current Utilization: {prod['current_utilization_pct']}%\n")
 
-    return msg
+    return "".join(parts)
 
 
-def generate_optimization_advice(results):
+@st.cache_data(show_spinner=False, max_entries=REPORT_CACHE_ENTRIES)
+def generate_optimization_advice(report_id, _results):
     """Generate optimization recommendations."""
+    results = _results
     prod = results["productivity"]
     utilization = prod["current_utilization_pct"]
 
-    msg = "### 💡 Production Optimization Recommendations\n\n"
-    msg += f"**Current Status:** Operating at {utilization}% of maximum potential\n\n"
+    parts = [
+        "### 💡 Production Optimization Recommendations\n\n",
+        f"**Current Status:** Operating at {utilization}% of maximum potential\n\n",
+    ]
 
     if utilization < 50:
-        msg += "🚀 **High optimization potential!**\n\n"
-        msg += "**Recommendations:**\n"
-        msg += "1. **Increase ESP frequency** - Could boost production significantly\n"
-        msg += "2. **Reduce wellhead backpressure** - Check surface facilities\n"
-        msg += "3. **Review choke settings** - May be restricting flow\n"
-        msg += (
+        parts.append("🚀 **High optimization potential!**\n\n")
+        parts.append("**Recommendations:**\n")
+        parts.append("1. **Increase ESP frequency** - Could boost production significantly\n")
+        parts.append("2. **Reduce wellhead backpressure** - Check surface facilities\n")
+        parts.append("3. **Review choke settings** - May be restricting flow\n")
+        parts.append(
             f"4. **Potential gain:** Up to "
             f"{prod['max_flow_rate_m3_h'] - results['operating_point']['flow_rate_m3_h']:.1f} m³/h\n"
         )
     elif utilization < 75:
-        msg += "📈 **Moderate optimization potential**\n\n"
-        msg += "**Recommendations:**\n"
-        msg += "1. **Fine-tune ESP settings** - Gradual frequency increase\n"
-        msg += "2. **Monitor reservoir pressure** - Ensure adequate drive\n"
-        msg += "3. **Optimize artificial lift** - Balance power vs production\n"
+        parts.append("📈 **Moderate optimization potential**\n\n")
+        parts.append("**Recommendations:**\n")
+        parts.append("1. **Fine-tune ESP settings** - Gradual frequency increase\n")
+        parts.append("2. **Monitor reservoir pressure** - Ensure adequate drive\n")
+        parts.append("3. **Optimize artificial lift** - Balance power vs production\n")
     else:
-        msg += "✅ **Well is operating efficiently!**\n\n"
-        msg += "Current utilization is good. Focus on:\n"
-        msg += "1. **Maintain current settings** - Don't over-produce\n"
-        msg += "2. **Monitor for decline** - Track performance over time\n"
-        msg += "3. **Prevent equipment damage** - Operating near capacity\n"
+        parts.append("✅ **Well is operating efficiently!**\n\n")
+        parts.append("Current utilization is good. Focus on:\n")
+        parts.append("1. **Maintain current settings** - Don't over-produce\n")
+        parts.append("2. **Monitor for decline** - Track performance over time\n")
+        parts.append("3. **Prevent equipment damage** - Operating near capacity\n")
 
-    return msg
+    return "".join(parts)
 
 
-def identify_limitations(results):
+@st.cache_data(show_spinner=False, max_entries=REPORT_CACHE_ENTRIES)
+def identify_limitations(report_id, _results):
     """Identify production limitations."""
+    results = _results
     pa = results["pressure_analysis"]
     fc = results["flow_characteristics"]
 
-    msg = "### 🔍 Production Limitation Analysis\n\n"
+    parts = ["### 🔍 Production Limitation Analysis\n\n"]
 
     total_drop = pa["total_pressure_drop_bar"]
     if total_drop == 0:
@@ -138,45 +194,41 @@ def identify_limitations(results):
         hydrostatic_pct = (pa["hydrostatic_pressure_drop_bar"] / total_drop) * 100
         friction_pct = (pa["friction_pressure_drop_bar"] / total_drop) * 100
 
-    msg += f"**Pressure Drop Breakdown:**\n"
-    msg += f"- Hydrostatic: {hydrostatic_pct:.1f}% ({pa['hydrostatic_pressure_drop_bar']} bar)\n"
-    msg += f"- Friction: {friction_pct:.1f}% ({pa['friction_pressure_drop_bar']} bar)\n\n"
+    parts.append("**Pressure Drop Breakdown:**\n")
+    parts.append(f"- Hydrostatic: {hydrostatic_pct:.1f}% ({pa['hydrostatic_pressure_drop_bar']} bar)\n")
+    parts.append(f"- Friction: {friction_pct:.1f}% ({pa['friction_pressure_drop_bar']} bar)\n\n")
 
-    msg += "**Main Limiting Factors:**\n\n"
+    parts.append("**Main Limiting Factors:**\n\n")
 
     if friction_pct > 10:
-        msg += "⚠️ **High friction losses** - Consider:\n"
-        msg += "- Larger tubing diameter\n"
-        msg += "- Scale/wax treatment\n"
-        msg += "- Flow regime optimization\n\n"
+        parts.append("⚠️ **High friction losses** - Consider:\n")
+        parts.append("- Larger tubing diameter\n")
+        parts.append("- Scale/wax treatment\n")
+        parts.append("- Flow regime optimization\n\n")
 
-    msg += "🔹 **Hydrostatic head** - Natural limitation due to well depth\n"
-    msg += "🔹 **Wellhead pressure** - Surface equipment backpressure\n"
-    msg += f"🔹 **Flow regime** - Currently {fc['flow_regime'].lower()}\n\n"
+    parts.append("🔹 **Hydrostatic head** - Natural limitation due to well depth\n")
+    parts.append("🔹 **Wellhead pressure** - Surface equipment backpressure\n")
+    parts.append(f"🔹 **Flow regime** - Currently {fc['flow_regime'].lower()}\n\n")
 
-    msg += "*The friction losses indicate tubing efficiency. Lower is better!*"
+    parts.append("*The friction losses indicate tubing efficiency. Lower is better!*")
 
-    return msg
+    return "".join(parts)
 
 
-def generate_response(user_input, report):
-    """Generate chatbot response based on user input and current report."""
-    lower_input = user_input.lower()
-
-    # No document uploaded
-    if not report:
-        if any(word in lower_input for word in ["upload", "how", "start"]):
-            return """To get started:
+def _help_upload(report):
+    return """To get started:
             
 1. Click the **Browse files** button in the sidebar  
-2. Select a PDF well completion report  
-3. Click **🚀 Analyze Document**  
+2. Select one or more PDF well completion reports  
+3. Click **🚀 Analyze Documents**  
 4. Wait for the analysis to complete  
 5. Ask me questions about the results!
 
 I support standard well completion reports with tables and technical data."""
-        elif any(word in lower_input for word in ["extract", "parameter"]):
-            return """I can extract many parameters from well documents:
+
+
+def _help_parameters(report):
+    return """I can extract many parameters from well documents:
 
 **Basic Info:** Well name, operation type, dates, duration  
 **Depths:** Packer, PBR, pump intake, total depth  
@@ -186,8 +238,10 @@ I support standard well completion reports with tables and technical data."""
 **Safety:** HSE incidents, operational notes  
 
 Upload a document to see what I can extract! 📄"""
-        elif any(word in lower_input for word in ["nodal", "analysis", "calculate"]):
-            return """**Nodal Analysis** determines well production capacity by analyzing pressure relationships.
+
+
+def _help_nodal(report):
+    return """**Nodal Analysis** determines well production capacity by analyzing pressure relationships.
 
 I calculate:  
 - **Pressure Distribution:** From reservoir to wellhead  
@@ -196,148 +250,310 @@ I calculate:
 - **Bottlenecks:** What's limiting production  
 
 Upload a document and I'll perform the analysis automatically! ⚙️"""
-        else:
-            return (
-                f"""I understand you're asking: *"{user_input}"*\n\n"""
-                "Please upload a PDF document first so I can help you analyze it! Use the sidebar to upload. 📤"
-            )
 
-    # Document is loaded
-    if any(word in lower_input for word in ["parameter", "extract", "data"]):
-        params = report["extracted_parameters"]
-        msg = "### 📋 Extracted Parameters\n\n"
-        for key, value in params.items():
-            if value:
-                msg += f"- **{key.replace('_', ' ').title()}:** {value}\n"
-        return msg
-
-    elif any(word in lower_input for word in ["nodal", "pressure", "flow"]):
-        nodal = report["nodal_analysis_results"]
-        if nodal["status"] == "success":
-            results = nodal["results"]
-            return format_nodal_details(results)
-        else:
-            return f"⚠️ Nodal analysis was incomplete: {nodal['message']}"
-
-    elif any(word in lower_input for word in ["summary", "overview"]):
-        return f"### 📝 Document Summary\n\n{report['summary']}"
-
-    elif any(word in lower_input for word in ["increase", "optimize", "improve"]):
-        nodal = report["nodal_analysis_results"]
-        if nodal["status"] == "success":
-            return generate_optimization_advice(nodal["results"])
-        return "I need successful nodal analysis results to provide optimization advice."
-
-    elif any(word in lower_input for word in ["limit", "bottleneck", "problem"]):
-        nodal = report["nodal_analysis_results"]
-        if nodal["status"] == "success":
-            return identify_limitations(nodal["results"])
-        return "I need successful nodal analysis results to identify limitations."
 
+def _handle_params(report):
+    params = report["extracted_parameters"]
+    parts = ["### 📋 Extracted Parameters\n\n"]
+    parts.extend(
+        f"- **{key.replace('_', ' ').title()}:** {value}\n"
+        for key, value in params.items()
+        if value
+    )
+    return "".join(parts)
+
+
+def _handle_nodal(report):
+    nodal = report["nodal_analysis_results"]
+    if nodal["status"] == "success":
+        results = nodal["results"]
+        return format_nodal_details(report["_report_id"], results)
     else:
+        return f"⚠️ Nodal analysis was incomplete: {nodal['message']}"
+
+
+def _handle_summary(report):
+    return f"### 📝 Document Summary\n\n{report['summary']}"
+
+
+def _handle_optimize(report):
+    nodal = report["nodal_analysis_results"]
+    if nodal["status"] == "success":
+        return generate_optimization_advice(report["_report_id"], nodal["results"])
+    return "I need successful nodal analysis results to provide optimization advice."
+
+
+def _handle_limitations(report):
+    nodal = report["nodal_analysis_results"]
+    if nodal["status"] == "success":
+        return identify_limitations(report["_report_id"], nodal["results"])
+    return "I need successful nodal analysis results to identify limitations."
+
+
+# Intent classifiers: one compiled alternation per table with a named group
+# per intent, so the input is scanned once. Keywords match at the start of
+# a word, which also covers plurals ("parameters", "limitations"); compounds
+# such as "inflow" or "backpressure" are listed explicitly.
+_HELP_INTENT_RE = re.compile(
+    r"\b(?:"
+    r"(?P<upload>upload|how|start)"
+    r"|(?P<params>extract|parameter)"
+    r"|(?P<nodal>nodal|analysis|calculate)"
+    r")"
+)
+
+_INTENT_RE = re.compile(
+    r"\b(?:"
+    r"(?P<params>parameter|extract|data)"
+    r"|(?P<nodal>nodal|pressure|flow|inflow|outflow|backpressure|overpressure)"
+    r"|(?P<summary>summary|overview)"
+    r"|(?P<optimize>increase|optimi[sz]e|improve)"
+    r"|(?P<limits>limit|bottleneck|problem)"
+    r")"
+)
+
+# Handlers in priority order, used when a question matches several intents
+_HELP_HANDLERS = (
+    ("upload", _help_upload),
+    ("params", _help_parameters),
+    ("nodal", _help_nodal),
+)
+
+_HANDLERS = (
+    ("params", _handle_params),
+    ("nodal", _handle_nodal),
+    ("summary", _handle_summary),
+    ("optimize", _handle_optimize),
+    ("limits", _handle_limitations),
+)
+
+
+def _dispatch(pattern, handlers, lower_input, report):
+    """Return the response of the highest-priority matching intent, or None."""
+    intents = {m.lastgroup for m in pattern.finditer(lower_input)}
+    for intent, handler in handlers:
+        if intent in intents:
+            return handler(report)
+    return None
+
+
+def generate_response(user_input, report):
+    """Generate chatbot response based on user input and current report."""
+    lower_input = user_input.lower()
+
+    # No document uploaded
+    if not report:
+        response = _dispatch(_HELP_INTENT_RE, _HELP_HANDLERS, lower_input, report)
+        if response is not None:
+            return response
         return (
             f"""I understand you're asking: *"{user_input}"*\n\n"""
-            "I can help you with:\n"
-            "- Show extracted parameters\n"
-            "- Explain nodal analysis results\n"
-            "- Provide optimization suggestions\n"
-            "- Identify production limitations\n"
-            "- Export the full report\n\n"
-            'Try asking: **"What are the nodal results?"** or **"How can we optimize production?"** 💡'
+            "Please upload a PDF document first so I can help you analyze it! Use the sidebar to upload. 📤"
         )
 
+    # Document is loaded
+    response = _dispatch(_INTENT_RE, _HANDLERS, lower_input, report)
+    if response is not None:
+        return response
+
+    return (
+        f"""I understand you're asking: *"{user_input}"*\n\n"""
+        "I can help you with:\n"
+        "- Show extracted parameters\n"
+        "- Explain nodal analysis results\n"
+        "- Provide optimization suggestions\n"
+        "- Identify production limitations\n"
+        "- Export the full report\n\n"
+        'Try asking: **"What are the nodal results?"** or **"How can we optimize production?"** 💡'
+    )
+
 
 def show_parameters():
     """Display parameters in a structured format."""
-    if st.session_state.current_report:
-        params = st.session_state.current_report["extracted_parameters"]
+    report = st.session_state.current_report
+    if not report:
+        return
+    params = report["extracted_parameters"]
 
-        st.subheader("📋 Extracted Parameters")
+    st.subheader("📋 Extracted Parameters")
 
-        col1, col2 = st.columns(2)
+    col1, col2 = st.columns(2)
 
-        with col1:
-            st.markdown("**Basic Information**")
-            for key in ["well_name", "operation", "start_date", "duration"]:
-                if params.get(key):
-                    st.text(f"{key.replace('_', ' ').title()}: {params[key]}")
+    with col1:
+        st.markdown("**Basic Information**")
+        for key, label in BASIC_INFO_FIELDS:
+            if params.get(key):
+                st.text(f"{label}: {params[key]}")
 
-        with col2:
-            st.markdown("**Technical Data**")
-            for key in [
-                "packer_depth_m",
-                "tubing_size",
-                "reservoir_temp_c",
-                "flow_rate_m3h",
-            ]:
-                if params.get(key):
-                    st.text(f"{key.replace('_', ' ').title()}: {params[key]}")
+    with col2:
+        st.markdown("**Technical Data**")
+        for key, label in TECHNICAL_FIELDS:
+            if params.get(key):
+                st.text(f"{label}: {params[key]}")
 
 
 def show_nodal_results():
     """Display nodal analysis results with metrics."""
-    if st.session_state.current_report:
-        nodal = st.session_state.current_report["nodal_analysis_results"]
+    report = st.session_state.current_report
+    if not report:
+        return
+    nodal = report["nodal_analysis_results"]
 
-        if nodal["status"] == "success":
-            results = nodal["results"]
-            op = results["operating_point"]
-            prod = results["productivity"]
+    if nodal["status"] == "success":
+        results = nodal["results"]
+        op = results["operating_point"]
+        prod = results["productivity"]
 
-            st.subheader("⚙️ Nodal Analysis Results")
+        st.subheader("⚙️ Nodal Analysis Results")
 
-            col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4 = st.columns(4)
 
-            with col1:
-                st.metric("Flow Rate", f"{op['flow_rate_m3_h']} m³/h")
+        with col1:
+            st.metric("Flow Rate", f"{op['flow_rate_m3_h']} m³/h")
 
-            with col2:
-                st.metric("WHP", f"{op['wellhead_pressure_bar']} bar")
+        with col2:
+            st.metric("WHP", f"{op['wellhead_pressure_bar']} bar")
 
-            with col3:
-                st.metric("BHP", f"{op['bottomhole_pressure_bar']} bar")
+        with col3:
+            st.metric("BHP", f"{op['bottomhole_pressure_bar']} bar")
 
-            with col4:
-                st.metric("Utilization", f"{prod['current_utilization_pct']}%")
+        with col4:
+            st.metric("Utilization", f"{prod['current_utilization_pct']}%")
 
 
 def show_summary():
     """Display summary."""
-    if st.session_state.current_report:
-        summary = st.session_state.current_report["summary"]
-        st.subheader("📝 Executive Summary")
-        st.write(summary)
+    report = st.session_state.current_report
+    if not report:
+        return
+    st.subheader("📝 Executive Summary")
+    st.write(report["summary"])
+
+
+def _json_safe(value):
+    """Replace NaN and infinite floats with None so encoders write null."""
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _json_default(value):
+    """Encode numpy scalars as their Python value and anything else as text."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+@st.cache_data(show_spinner=False, max_entries=REPORT_CACHE_ENTRIES)
+def serialize_report(report_id, _report):
+    """Encode a report as indented JSON bytes, using orjson when installed."""
+    report = _json_safe({k: v for k, v in _report.items() if k != "_report_id"})
+    if orjson is not None:
+        try:
+            return orjson.dumps(report, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            # e.g. numpy scalars or non-str keys, which json.dumps accepts
+            pass
+    return json.dumps(report, indent=2, ensure_ascii=False, default=_json_default).encode("utf-8")
 
 
 def download_report():
     """Allow user to download the full JSON report."""
-    if st.session_state.current_report:
-        import json
+    report = st.session_state.current_report
+    if not report:
+        return
 
-        report_json = json.dumps(st.session_state.current_report, indent=2)
+    st.download_button(
+        label="📥 Download Full Report (JSON)",
+        data=serialize_report(report["_report_id"], report),
+        file_name=f"well_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        mime="application/json",
+    )
 
-        st.download_button(
-            label="📥 Download Full Report (JSON)",
-            data=report_json,
-            file_name=f"well_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            mime="application/json",
-        )
+
+@st.cache_resource
+def get_executor():
+    """Worker pool for background analyses, shared across reruns."""
+    return ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS)
+
+
+def save_upload(uploaded_file):
+    """Stream an uploaded PDF to a temp file and return its path."""
+    # Save uploaded file in a safe /tmp directory (required on HuggingFace Spaces)
+    with tempfile.NamedTemporaryFile(dir="/tmp", delete=False, suffix=".pdf") as tmp_file:
+        try:
+            # Copy in 1 MiB chunks rather than holding the whole PDF in memory
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, tmp_file, UPLOAD_CHUNK_SIZE)
+        except BaseException:
+            tmp_file.close()
+            os.unlink(tmp_file.name)
+            raise
+        return tmp_file.name
+
+
+def run_agent(tmp_path, word_limit):
+    """Analyze a saved PDF and delete it afterwards.
+
+    Runs on a worker thread when analysis is in the background, so it must
+    not touch st.session_state.
+    """
+    try:
+        agent = WellAnalysisAgent(tmp_path, word_limit=word_limit)
+        report = agent.run()
+    finally:
+        # Clean up temp file
+        os.unlink(tmp_path)
+
+    report["_report_id"] = uuid4().hex
+    return report
+
+
+def store_report(report, file_name):
+    """Make a finished report current and post its results to the chat."""
+    st.session_state.current_report = report
+
+    st.session_state.messages.append(
+        {
+            "role": "user",
+            "content": f"Analyze {file_name}",
+        }
+    )
+
+    results_msg = format_analysis_results(report)
+    st.session_state.messages.append({"role": "assistant", "content": results_msg})
+
+
+def store_failure(file_name, error):
+    """Post a failed analysis to the chat."""
+    st.session_state.messages.append({"role": "user", "content": f"Analyze {file_name}"})
+    st.session_state.messages.append(
+        {"role": "assistant", "content": f"❌ Analysis of {file_name} failed: {str(error)}"}
+    )
+
+
+@st.fragment(run_every=ANALYSIS_POLL_INTERVAL_S)
+def show_analysis_status():
+    """Show running analyses, rerunning the whole app once the next one finishes."""
+    pending = st.session_state.pending_analysis
+    if pending and pending[0]["future"].done():
+        # Full rerun so the collection loop posts the result to the chat
+        st.rerun()
+    running_names = [job["file_name"] for job in pending]
+    with st.status(f"Analyzing {', '.join(running_names)}...", state="running"):
+        st.write("This may take a minute. You can keep chatting meanwhile.")
 
 
 # --------------------------------------------------------------------
 # Streamlit Page setup
 # --------------------------------------------------------------------
 
-st.set_page_config(
-    page_title="Well Analysis Assistant",
-    page_icon="🛢️",
-    layout="wide",
-    initial_sidebar_state="expanded",
-)
-
-# Custom CSS for better styling
-st.markdown(
-    """
+# Static page content, sent as one markdown element each
+APP_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -345,19 +561,6 @@ st.markdown(
         text-align: center;
         margin-bottom: 1rem;
     }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-    }
-    .user-message {
-        background-color: #667eea;
-        color: white;
-    }
-    .bot-message {
-        background-color: #f0f2f6;
-        border-left: 4px solid #667eea;
-    }
     .metric-card {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         color: white;
@@ -366,10 +569,33 @@ st.markdown(
         text-align: center;
     }
 </style>
-""",
-    unsafe_allow_html=True,
+"""
+
+HEADER_HTML = (
+    '<h1 class="main-header">🛢️ Well Analysis Assistant</h1>\n'
+    '<p style="text-align: center; color: #666;">RAG-powered nodal analysis chatbot</p>'
+)
+
+HOW_TO_USE_MD = """---
+
+### 💡 How to Use
+
+1. Upload one or more PDF documents  
+2. Click **'Analyze Documents'**  
+3. Ask questions in the chat  
+4. View results and download  
+"""
+
+st.set_page_config(
+    page_title="Well Analysis Assistant",
+    page_icon="🛢️",
+    layout="wide",
+    initial_sidebar_state="expanded",
 )
 
+# Custom CSS for better styling
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = [
@@ -394,73 +620,80 @@ if "current_report" not in st.session_state:
 if "uploaded_file_name" not in st.session_state:
     st.session_state.uploaded_file_name = None
 
+if "pending_analysis" not in st.session_state:
+    st.session_state.pending_analysis = []
+
+# Collect finished background analyses, in the order they were submitted
+pending = st.session_state.pending_analysis
+while pending and pending[0]["future"].done():
+    job = pending.pop(0)
+    try:
+        report = job["future"].result()
+    except Exception as e:
+        store_failure(job["file_name"], e)
+    else:
+        store_report(report, job["file_name"])
+
 # Header
-st.markdown(
-    '<h1 class="main-header">🛢️ Well Analysis Assistant</h1>',
-    unsafe_allow_html=True,
-)
-st.markdown(
-    '<p style="text-align: center; color: #666;">RAG-powered nodal analysis chatbot</p>',
-    unsafe_allow_html=True,
-)
+st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
 # Sidebar for file upload and settings
 with st.sidebar:
     st.header("📁 Document Upload")
 
-    uploaded_file = st.file_uploader(
-        "Upload Well Report (PDF)",
+    uploaded_files = st.file_uploader(
+        "Upload Well Reports (PDF)",
         type=["pdf"],
-        help="Upload a well completion report for analysis",
+        accept_multiple_files=True,
+        help="Upload one or more well completion reports for analysis",
     )
 
-    if uploaded_file:
-        st.session_state.uploaded_file_name = uploaded_file.name
-        st.success(f"✅ {uploaded_file.name} uploaded!")
+    if uploaded_files:
+        file_names = [f.name for f in uploaded_files]
+        st.session_state.uploaded_file_name = ", ".join(file_names)
+        st.success(f"✅ {st.session_state.uploaded_file_name} uploaded!")
 
         # Settings
         st.header("⚙️ Settings")
         word_limit = st.slider("Summary word limit", 100, 500, 250, 50)
 
         # Analysis button
-        if st.button("🚀 Analyze Document", type="primary"):
-            with st.spinner("Analyzing document... This may take a minute."):
-                try:
-                    # Save uploaded file in a safe /tmp directory (required on HuggingFace Spaces)
-                    with tempfile.NamedTemporaryFile(
-                        dir="/tmp", delete=False, suffix=".pdf"
-                    ) as tmp_file:
-                        tmp_file.write(uploaded_file.getvalue())
-                        tmp_path = tmp_file.name
-
-                    # Run analysis
-                    agent = WellAnalysisAgent(tmp_path, word_limit=word_limit)
-                    report = agent.run()
-
-                    # Clean up temp file
+        analysis_running = bool(st.session_state.pending_analysis)
+        if st.button("🚀 Analyze Documents", type="primary", disabled=analysis_running):
+            # Saved files not yet handed to run_agent, which deletes its own file
+            tmp_paths = []
+            try:
+                for uploaded_file in uploaded_files:
+                    tmp_paths.append(save_upload(uploaded_file))
+
+                if RUN_ANALYSIS_IN_BACKGROUND:
+                    # One job per file so a bad PDF only fails its own analysis
+                    for file_name, tmp_path in zip(file_names, list(tmp_paths)):
+                        future = get_executor().submit(run_agent, tmp_path, word_limit)
+                        tmp_paths.remove(tmp_path)
+                        st.session_state.pending_analysis.append(
+                            {"future": future, "file_name": file_name}
+                        )
+                else:
+                    with st.spinner("Analyzing documents... This may take a minute."):
+                        for file_name, tmp_path in zip(file_names, list(tmp_paths)):
+                            tmp_paths.remove(tmp_path)
+                            try:
+                                store_report(run_agent(tmp_path, word_limit), file_name)
+                            except Exception as e:
+                                store_failure(file_name, e)
+
+                st.rerun()
+
+            except Exception as e:
+                st.error(f"❌ Analysis failed: {str(e)}")
+
+            finally:
+                for tmp_path in tmp_paths:
                     os.unlink(tmp_path)
 
-                    # Store report
-                    st.session_state.current_report = report
-
-                    # Add success message to chat
-                    st.session_state.messages.append(
-                        {
-                            "role": "user",
-                            "content": f"Analyze {uploaded_file.name}",
-                        }
-                    )
-
-                    # Format results message
-                    results_msg = format_analysis_results(report)
-                    st.session_state.messages.append(
-                        {"role": "assistant", "content": results_msg}
-                    )
-
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"❌ Analysis failed: {str(e)}")
+    if st.session_state.pending_analysis:
+        show_analysis_status()
 
     # Quick actions
     if st.session_state.current_report:
@@ -479,36 +712,19 @@ with st.sidebar:
             download_report()
 
     # Info
-    st.markdown("---")
-    st.markdown("### 💡 How to Use")
-    st.markdown(
-        """
-1. Upload a PDF document  
-2. Click **'Analyze Document'**  
-3. Ask questions in the chat  
-4. View results and download  
-"""
-    )
+    st.markdown(HOW_TO_USE_MD)
 
 # Main chat interface
 chat_container = st.container()
 
 with chat_container:
+    # Keep only recent history so each rerun renders a bounded number of messages
+    del st.session_state.messages[:-MAX_CHAT_HISTORY]
+
     # Display chat messages
     for message in st.session_state.messages:
-        role = message["role"]
-        content = message["content"]
-
-        if role == "user":
-            st.markdown(
-                f'<div class="chat-message user-message">👤 **You:** {content}</div>',
-                unsafe_allow_html=True,
-            )
-        else:
-            st.markdown(
-                f'<div class="chat-message bot-message">🤖 **Assistant:**\n\n{content}</div>',
-                unsafe_allow_html=True,
-            )
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
 
 # Chat input
 user_input = st.chat_input("Ask me anything about well analysis...")